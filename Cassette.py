@@ -0,0 +1,178 @@
+import base64
+import gzip
+import hashlib
+import importlib
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+
+import requests
+from google.auth.credentials import AnonymousCredentials
+from google.auth.transport.requests import AuthorizedSession
+
+active_cassette = None
+
+# Modules whose retry loops sleep between operation polls (the module moved in newer api_core releases)
+POLLING_RETRY_MODULES = ['google.api_core.retry.retry_unary', 'google.api_core.retry']
+
+
+def client_kwargs():
+    """Keyword arguments for GCP client constructors.
+
+    While a cassette is active every client has to go through the REST
+    transport so its calls pass through the patched HTTP session. Replay runs
+    use anonymous credentials so they work without access to the projects.
+    """
+    if active_cassette is None:
+        return {}
+    kwargs = {'transport': 'rest'}
+    if active_cassette.mode == 'replay':
+        kwargs['credentials'] = AnonymousCredentials()
+    return kwargs
+
+
+def is_replaying():
+    """Whether calls are currently being served from a cassette rather than live APIs."""
+    return active_cassette is not None and active_cassette.mode == 'replay'
+
+
+class NoSleepTime:
+    """Stand-in for the time module that skips sleeps, used by replayed polling loops."""
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+    @staticmethod
+    def sleep(seconds):
+        pass
+
+
+class Cassette:
+    """Record GCP API traffic to a gzipped JSON file, or replay it offline.
+
+    Works at the HTTP level by patching AuthorizedSession.request, so every
+    call made by the REST transports (including pagination and operation
+    polling) is captured. Responses for identical requests are replayed in
+    the order they were recorded.
+    """
+
+    def __init__(self, path, mode='replay', timing_fidelity=False):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown cassette mode '{mode}'. Use 'record' or 'replay'.")
+        self.path = path
+        self.mode = mode
+        self.timing_fidelity = timing_fidelity
+        self.interactions = []
+        self.replay_queues = defaultdict(deque)
+        self.lock = threading.Lock()
+        self.original_request = None
+        self.patched_retry_modules = []
+
+    def __enter__(self):
+        global active_cassette
+        if self.mode == 'replay':
+            self.load()
+        self.original_request = AuthorizedSession.request
+        cassette = self
+
+        def request(session, method, url, data=None, headers=None, **kwargs):
+            return cassette.handle_request(session, method, url, data, headers, **kwargs)
+
+        AuthorizedSession.request = request
+        if self.mode == 'replay' and not self.timing_fidelity:
+            self.disable_polling_delay()
+        active_cassette = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global active_cassette
+        AuthorizedSession.request = self.original_request
+        for module in self.patched_retry_modules:
+            module.time = time
+        self.patched_retry_modules = []
+        active_cassette = None
+        if self.mode == 'record':
+            self.save()
+        return False
+
+    def disable_polling_delay(self):
+        """Stop operation.result() from backing off between recorded polls.
+
+        api_core's PollingFuture sleeps 1s growing to 20s between polls; with
+        recorded responses those sleeps are the only thing left slowing a
+        replay down.
+        """
+        for module_name in POLLING_RETRY_MODULES:
+            try:
+                module = importlib.import_module(module_name)
+            except ImportError:
+                continue
+            if getattr(module, 'time', None) is time:
+                module.time = NoSleepTime()
+                self.patched_retry_modules.append(module)
+
+    def handle_request(self, session, method, url, data, headers, **kwargs):
+        full_url = requests.Request(method, url, params=kwargs.get('params')).prepare().url
+        key = self.request_key(method, full_url, data)
+        if self.mode == 'replay':
+            return self.replay(key, method, full_url)
+
+        start = time.monotonic()
+        response = self.original_request(session, method, url, data=data, headers=headers, **kwargs)
+        elapsed = time.monotonic() - start
+        try:
+            content, encoding = response.content.decode('utf-8'), 'utf-8'
+        except UnicodeDecodeError:
+            content, encoding = base64.b64encode(response.content).decode('ascii'), 'base64'
+        with self.lock:
+            self.interactions.append({
+                'key': key,
+                'status': response.status_code,
+                'content_type': response.headers.get('Content-Type', 'application/json'),
+                'content': content,
+                'encoding': encoding,
+                'elapsed': round(elapsed, 4)
+            })
+        return response
+
+    def replay(self, key, method, full_url):
+        with self.lock:
+            queue = self.replay_queues.get(key)
+            if not queue:
+                raise LookupError(f"No recorded response left in cassette {self.path} for {method} {full_url}")
+            interaction = queue.popleft()
+        if self.timing_fidelity:
+            time.sleep(interaction['elapsed'])
+
+        response = requests.Response()
+        response.status_code = interaction['status']
+        response.headers['Content-Type'] = interaction['content_type']
+        if interaction['encoding'] == 'base64':
+            response._content = base64.b64decode(interaction['content'])
+        else:
+            response._content = interaction['content'].encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = full_url
+        response.request = requests.Request(method, full_url).prepare()
+        return response
+
+    @staticmethod
+    def request_key(method, full_url, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        body_hash = hashlib.sha1(data).hexdigest() if data else ''
+        return f"{method.upper()} {full_url} {body_hash}"
+
+    def load(self):
+        with gzip.open(self.path, 'rt', encoding='utf-8') as cassette_file:
+            self.interactions = json.load(cassette_file)['interactions']
+        for interaction in self.interactions:
+            self.replay_queues[interaction['key']].append(interaction)
+        logging.info(f"Loaded {len(self.interactions)} recorded API calls from {self.path}.")
+
+    def save(self):
+        with gzip.open(self.path, 'wt', encoding='utf-8') as cassette_file:
+            json.dump({'version': 1, 'interactions': self.interactions}, cassette_file, separators=(',', ':'))
+        logging.info(f"Recorded {len(self.interactions)} API calls to {self.path}.")
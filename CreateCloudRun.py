@@ -6,6 +6,7 @@ from google.cloud import resourcemanager_v3
 from google.iam.v1 import iam_policy_pb2 as iam_policy
 from google.iam.v1 import policy_pb2 as policy
 from GetDetails import GetDetails
+from Cassette import client_kwargs, is_replaying
 from google.cloud import artifactregistry_v1beta2
 
 
@@ -14,10 +15,10 @@ class CloudRunCreator:
         self.target_project = target_project
         self.source_project = source_project
         self.get_details = GetDetails(source_project)
-        self.run_client = run_v2.ServicesClient()
-        self.iam_client = resourcemanager_v3.ProjectsClient()
+        self.run_client = run_v2.ServicesClient(**client_kwargs())
+        self.iam_client = resourcemanager_v3.ProjectsClient(**client_kwargs())
         self.user_choice = self.prompt_user_choice()
-        self.artifact_registry_client = artifactregistry_v1beta2.ArtifactRegistryClient()
+        self.artifact_registry_client = artifactregistry_v1beta2.ArtifactRegistryClient(**client_kwargs())
 
     def create_cloud_run_services(self, cloud_run_details):
         if self.user_choice == 'copy_images':
@@ -91,7 +92,7 @@ class CloudRunCreator:
         return f"service-{project_number}@serverless-robot-prod.iam.gserviceaccount.com"
 
     def grant_artifact_registry_reader_role(self, email):
-        policy_client = resourcemanager_v3.ProjectsClient()
+        policy_client = resourcemanager_v3.ProjectsClient(**client_kwargs())
 
 
         request = iam_policy.GetIamPolicyRequest(resource=f"projects/{self.source_project}")
@@ -142,6 +143,11 @@ class CloudRunCreator:
                             target_repository = f'{location}/{self.target_project}/{source_repository}'
                             self.ensure_repository_exists(location.split('-')[0] + '-' + location.split('-')[1], source_repository)# Tag is the second part if available, else 'latest'
 
+                        # Docker is not part of the cassette, so never pull or push while replaying
+                        if is_replaying():
+                            logging.info(f"Replaying a cassette. Skipping docker copy of image {image} "
+                                         f"to {target_repository}/{name}:{image_tag}.")
+                            continue
 
                         # Pull
                         subprocess.run(['docker', 'pull', image], check=True)
@@ -1,18 +1,30 @@
+import copy
 import logging
 from google.cloud import compute_v1
 from GetDetails import GetDetails
+from Cassette import client_kwargs
+from SubnetPlanner import SubnetPlanner
+from DiskCloner import DiskCloner
 from google.api_core.exceptions import NotFound
 
 
 class VMCreator:
-    def __init__(self, target_project):
+    BULK_INSERT_LIMIT = 1000
+
+    def __init__(self, target_project, source_project=None, clone_disks=False):
         self.target_project = target_project
-        self.compute_client = compute_v1.InstancesClient()
-        self.network_client = compute_v1.NetworksClient()
-        self.subnetwork_client = compute_v1.SubnetworksClient()  # Added SubnetworksClient
+        self.compute_client = compute_v1.InstancesClient(**client_kwargs())
+        self.network_client = compute_v1.NetworksClient(**client_kwargs())
+        self.subnetwork_client = compute_v1.SubnetworksClient(**client_kwargs())  # Added SubnetworksClient
+        self.subnet_planner = SubnetPlanner(target_project)
+        # Snapshot cloning keeps disk data, but gives every instance its own snapshots,
+        # so identical fleets can no longer share a bulk insert; it is opt-in
+        self.disk_cloner = DiskCloner(source_project, target_project) if clone_disks else None
+        self.disk_snapshots = {}
         self.existing_instances_details = []
 
-    def clone_instances_to_target_project(self, instances_details):
+    def clone_instances_to_target_project(self, instances_details, subnet_details=None):
+        instances_to_create = []
         for instance_detail in instances_details:
             if "gke" in instance_detail['name'].lower():
                 logging.info(f"Skipping instance {instance_detail['name']} as it originates from GKE")
@@ -20,7 +32,58 @@ class VMCreator:
             if self.instance_exists(instance_detail['name'], instance_detail['zone']):
                 logging.info(f"Instance {instance_detail['name']} already exists in zone {instance_detail['zone']}. Skipping creation.")
                 continue
-            self.create_vm_instance(instance_detail)
+            instances_to_create.append(instance_detail)
+
+        self.plan_subnets(instances_to_create, subnet_details or [])
+
+        if self.disk_cloner is not None:
+            self.disk_snapshots = self.disk_cloner.snapshot_disks(instances_to_create)
+
+        for group in self.group_instances(instances_to_create):
+            if len(group) > 1:
+                self.bulk_create_instances(group)
+            else:
+                self.create_vm_instance(group[0])
+
+    def group_instances(self, instances_details):
+        """Group instances that differ only by name so each group can be bulk inserted."""
+        groups = {}
+        for instance_detail in instances_details:
+            groups.setdefault(self.instance_group_key(instance_detail), []).append(instance_detail)
+        return [
+            group[start:start + self.BULK_INSERT_LIMIT]
+            for group in groups.values()
+            for start in range(0, len(group), self.BULK_INSERT_LIMIT)
+        ]
+
+    def instance_group_key(self, instance_detail):
+        # Console-created boot disks default their device name to the instance name,
+        # so treat that as a wildcard rather than a per-instance difference
+        disks = tuple(
+            (disk['boot'], disk['type'], disk['diskSizeGb'], disk['image'],
+             None if disk['deviceName'] == instance_detail['name'] else disk['deviceName'],
+             self.disk_snapshots.get(disk.get('source')))
+            for disk in instance_detail['disks']
+        )
+        network_interfaces = tuple((ni['network'], ni['subnetwork']) for ni in instance_detail['network_interfaces'])
+        return (
+            instance_detail['zone'],
+            instance_detail['machine_type'],
+            disks,
+            network_interfaces,
+            tuple(sorted(instance_detail.get('tags', [])))
+        )
+
+    def plan_subnets(self, instances_details, subnet_details):
+        """Plan CIDR ranges for every subnet the instances use, in a single pass."""
+        required_subnets = []
+        for instance_detail in instances_details:
+            region = '-'.join(instance_detail['zone'].split('-')[:-1])
+            for ni in instance_detail['network_interfaces']:
+                required_subnets.append((region, ni['subnetwork'], ni['network']))
+
+        self.subnet_planner.load_target_subnets()
+        self.subnet_planner.plan_subnets(subnet_details, required_subnets)
 
     def instance_exists(self, instance_name, zone):
         try:
@@ -62,17 +125,7 @@ class VMCreator:
             logging.error(f"An error occurred while creating VPC '{vpc_name}': {e}")
             return False
 
-    def subnet_exists(self, subnet_name, region):
-        try:
-            self.subnetwork_client.get(project=self.target_project, region=region, subnetwork=subnet_name)
-            return True
-        except NotFound:
-            return False
-        except Exception as e:
-            logging.error(f"An error occurred while checking if Subnetwork '{subnet_name}' exists in region {region}: {e}")
-            return False
-
-    def create_subnet(self, subnet_name, region, vpc_name, ip_cidr_range="10.0.0.0/24"):
+    def create_subnet(self, subnet_name, region, vpc_name, ip_cidr_range, secondary_ip_ranges=None):
         """Create a subnet within the specified VPC."""
         subnet_body = {
             "name": subnet_name,
@@ -80,6 +133,8 @@ class VMCreator:
             "ip_cidr_range": ip_cidr_range,
             "region": region
         }
+        if secondary_ip_ranges:
+            subnet_body["secondary_ip_ranges"] = secondary_ip_ranges
         try:
             operation = self.subnetwork_client.insert(
                 project=self.target_project,
@@ -94,8 +149,81 @@ class VMCreator:
             return False
 
     def create_vm_instance(self, instance_detail):
+        instance_body = self.build_instance_body(instance_detail)
+        if instance_body is None:
+            return
+        self.insert_instance(instance_detail, instance_body)
+
+    def insert_instance(self, instance_detail, instance_body):
+        try:
+            operation = self.compute_client.insert(project=self.target_project, zone=instance_detail['zone'],
+                                                   instance_resource=instance_body)
+            operation.result()
+            logging.info(f"Instance {instance_detail['name']} created successfully.")
+        except Exception as e:
+            logging.error(f"An error occurred while creating the instance '{instance_detail['name']}': {e}")
+
+    def bulk_create_instances(self, instances_details):
+        """Create a group of identical instances with a single bulkInsert operation.
+
+        Disk names, and device names that matched the instance name, are left
+        to the API (boot disks take the instance name), since the shared
+        instance properties cannot carry them per instance. If the bulk
+        request fails, the instances it did not create are inserted one by one.
+        """
+        zone = instances_details[0]['zone']
+        instance_names = [instance_detail['name'] for instance_detail in instances_details]
+
+        instance_body = self.build_instance_body(instances_details[0])
+        if instance_body is None:
+            logging.error(f"Skipping instances {', '.join(instance_names[1:])} as they share the same configuration.")
+            return
+        single_instance_body = copy.deepcopy(instance_body)
+
+        for disk in instance_body['disks']:
+            disk['initialize_params'].pop('disk_name', None)
+            if disk['device_name'] == instances_details[0]['name']:
+                del disk['device_name']
+        del instance_body['name']
+        instance_body['machine_type'] = instances_details[0]['machine_type']
+
+        bulk_insert_body = {
+            'count': len(instance_names),
+            'min_count': len(instance_names),
+            'instance_properties': instance_body,
+            'per_instance_properties': {name: {'name': name} for name in instance_names}
+        }
+
+        try:
+            operation = self.compute_client.bulk_insert(project=self.target_project, zone=zone,
+                                                        bulk_insert_instance_resource_resource=bulk_insert_body)
+            operation.result()
+            logging.info(f"Instances {', '.join(instance_names)} created successfully in one bulk insert.")
+        except Exception as e:
+            # The operation may have failed or timed out after creating some of the instances
+            missing_instances = [instance_detail for instance_detail in instances_details
+                                 if not self.instance_exists(instance_detail['name'], zone)]
+            logging.error(f"An error occurred while bulk creating instances {', '.join(instance_names)} "
+                          f"in zone {zone}: {e}. Falling back to single inserts for "
+                          f"{', '.join(instance_detail['name'] for instance_detail in missing_instances) or 'none'}.")
+            for instance_detail in missing_instances:
+                self.insert_instance(instance_detail, self.instance_body_for(single_instance_body, instance_detail))
+
+    def instance_body_for(self, instance_body, instance_detail):
+        """Copy an instance resource built for another member of the same group and rename it."""
+        instance_body = copy.deepcopy(instance_body)
+        instance_body['name'] = instance_detail['name']
+        for disk_config, disk in zip(instance_body['disks'], instance_detail['disks']):
+            disk_config['initialize_params']['disk_name'] = disk['diskName']
+            disk_config['device_name'] = disk['deviceName']
+        return instance_body
+
+    def build_instance_body(self, instance_detail):
+        """Build the instance resource, creating its VPCs and subnets when missing.
+
+        Returns None if a VPC, subnet or disk snapshot the instance needs is unavailable.
+        """
         zone = instance_detail['zone']
-        project = self.target_project
 
         region = '-'.join(zone.split('-')[:-1])
 
@@ -123,31 +251,52 @@ class VMCreator:
                 'device_name': device_name
             }
 
+            # Prefer the snapshot so the disk keeps its data, not just the image
+            source_snapshot = self.disk_snapshots.get(disk.get('source'))
+            if disk.get('source') in self.disk_snapshots and source_snapshot is None:
+                logging.error(f"Snapshot of disk '{disk_name}' failed. Skipping instance {instance_detail['name']} "
+                              f"rather than creating it without its data.")
+                return None
+            if source_snapshot is not None:
+                disk_config['initialize_params']['source_snapshot'] = source_snapshot
+                disk_config['initialize_params']['source_image'] = None
+
             if disk_config['initialize_params']['source_image'] is None:
                 del disk_config['initialize_params']['source_image']
 
             disks.append(disk_config)
 
-        # Check if the specified network exists, else use the default network
+        # Make sure the specified network exists
         network_interfaces = []
         for ni in instance_detail['network_interfaces']:
             network_name = ni['network']
             if not self.vpc_exists(network_name):
                 logging.info(f"VPC '{network_name}' does not exist. Creating it.")
                 if not self.create_vpc(network_name):
-                    logging.warning(f"Failed to create VPC '{network_name}'. Using the default network instead.")
-                    network_name = 'default'
+                    logging.error(f"Failed to create VPC '{network_name}'. Skipping instance {instance_detail['name']}.")
+                    return None
             subnet_name = ni['subnetwork']
-            if not self.subnet_exists(subnet_name, region):
-                logging.info(f"Subnetwork '{subnet_name}' does not exist in region {region}. Creating it.")
-                self.create_subnet(subnet_name, region, network_name)
+            if not self.subnet_planner.subnet_exists(subnet_name, region):
+                subnet_plan = self.subnet_planner.get_plan(subnet_name, region)
+                if subnet_plan is None:
+                    logging.error(f"No address range planned for Subnetwork '{subnet_name}' in region {region}. "
+                                  f"Skipping instance {instance_detail['name']}.")
+                    return None
+                logging.info(f"Subnetwork '{subnet_name}' does not exist in region {region}. "
+                             f"Creating it with range {subnet_plan['ip_cidr_range']}.")
+                if not self.create_subnet(subnet_name, region, network_name,
+                                          ip_cidr_range=subnet_plan['ip_cidr_range'],
+                                          secondary_ip_ranges=subnet_plan['secondary_ip_ranges']):
+                    logging.error(f"Failed to create Subnetwork '{subnet_name}'. Skipping instance {instance_detail['name']}.")
+                    return None
+                self.subnet_planner.existing_subnets.add((region, subnet_name))
             network_interface = {
                 'network': f"projects/{self.target_project}/global/networks/{network_name}",
                 'subnetwork': f"regions/{region}/subnetworks/{subnet_name}"
             }
             network_interfaces.append(network_interface)
 
-        instance_body = {
+        return {
             'name': instance_detail['name'],
             'machine_type': f"zones/{zone}/machineTypes/{instance_detail['machine_type']}",
             'disks': disks,
@@ -157,13 +306,6 @@ class VMCreator:
             }
         }
 
-        try:
-            operation = self.compute_client.insert(project=project, zone=zone, instance_resource=instance_body)
-            operation.result()
-            logging.info(f"Instance {instance_detail['name']} created successfully.")
-        except Exception as e:
-            logging.error(f"An error occurred while creating the instance '{instance_detail['name']}': {e}")
-
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
@@ -173,6 +315,7 @@ if __name__ == '__main__':
 
     get_details = GetDetails(source_project=source_project_id)
     instances_details = get_details.get_instance_details()
+    subnet_details = get_details.get_subnet_details()
 
     vm_creator = VMCreator(target_project=target_project_id)
-    vm_creator.clone_instances_to_target_project(instances_details)
+    vm_creator.clone_instances_to_target_project(instances_details, subnet_details)
@@ -0,0 +1,92 @@
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from google.cloud import compute_v1
+from Cassette import client_kwargs
+
+
+class DiskCloner:
+    """Snapshot source disks into the target project so cloned instances keep their data.
+
+    Boot and data disks are snapshotted concurrently under a bounded thread
+    pool. Snapshots of a disk are never deleted, so a repeat run takes an
+    incremental snapshot on top of the previous one.
+    """
+
+    def __init__(self, source_project, target_project, max_workers=8):
+        self.source_project = source_project
+        self.target_project = target_project
+        self.max_workers = max_workers
+        self.snapshots_client = compute_v1.SnapshotsClient(**client_kwargs())
+        self.snapshot_generations = {}
+
+    def load_existing_snapshots(self):
+        """Find the latest snapshot generation of each source disk in the target project."""
+        try:
+            for snapshot in self.snapshots_client.list(project=self.target_project):
+                if not snapshot.source_disk:
+                    continue
+                source_disk = 'projects/' + snapshot.source_disk.split('projects/', 1)[-1]
+                prefix = self.snapshot_prefix(source_disk)
+                # Only count snapshots this tool took, not ones the user named themselves
+                if not snapshot.name.startswith(prefix):
+                    continue
+                generation = snapshot.name[len(prefix):]
+                if generation.isdigit():
+                    self.snapshot_generations[source_disk] = max(
+                        self.snapshot_generations.get(source_disk, 0), int(generation))
+        except Exception as e:
+            logging.error(f"An error occurred while listing snapshots in project {self.target_project}: {e}")
+
+    def snapshot_disks(self, instances_details):
+        """Snapshot every disk of the given instances in parallel.
+
+        Returns a dict mapping each source disk path (zonal or regional) to the
+        snapshot path in the target project, or to None when the snapshot failed.
+        """
+        self.load_existing_snapshots()
+
+        snapshot_requests = {}
+        for instance_detail in instances_details:
+            for disk in instance_detail['disks']:
+                source_disk = disk.get('source', 'N/A')
+                if source_disk == 'N/A' or source_disk in snapshot_requests:
+                    continue
+                snapshot_requests[source_disk] = self.next_snapshot_name(source_disk)
+
+        snapshots = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self.create_snapshot, source_disk, snapshot_name): source_disk
+                for source_disk, snapshot_name in snapshot_requests.items()
+            }
+            for future in as_completed(futures):
+                snapshots[futures[future]] = future.result()
+        succeeded = sum(1 for snapshot in snapshots.values() if snapshot is not None)
+        logging.info(f"Snapshotted {succeeded} of {len(snapshot_requests)} disks.")
+        return snapshots
+
+    @staticmethod
+    def snapshot_prefix(source_disk):
+        disk_name = source_disk.split('/')[-1]
+        disk_hash = hashlib.sha1(source_disk.encode('utf-8')).hexdigest()[:6]
+        return f"{disk_name[:48]}-{disk_hash}-"
+
+    def next_snapshot_name(self, source_disk):
+        generation = self.snapshot_generations.get(source_disk, 0) + 1
+        self.snapshot_generations[source_disk] = generation
+        return f"{self.snapshot_prefix(source_disk)}{generation}"
+
+    def create_snapshot(self, source_disk, snapshot_name):
+        snapshot_body = {
+            'name': snapshot_name,
+            'source_disk': source_disk
+        }
+        try:
+            operation = self.snapshots_client.insert(project=self.target_project, snapshot_resource=snapshot_body)
+            operation.result()
+            logging.info(f"Snapshot '{snapshot_name}' of disk {source_disk} created successfully.")
+            return f"projects/{self.target_project}/global/snapshots/{snapshot_name}"
+        except Exception as e:
+            logging.error(f"An error occurred while creating snapshot '{snapshot_name}' of disk {source_disk}: {e}")
+            return None
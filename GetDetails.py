@@ -1,13 +1,14 @@
 import logging
 from google.cloud import asset_v1
 from google.cloud import compute_v1
+from Cassette import client_kwargs
 
 
 class GetDetails:
     def __init__(self, source_project):
         self.source_project = source_project
-        self.asset_client = asset_v1.AssetServiceClient()
-        self.compute_client = compute_v1.DisksClient()
+        self.asset_client = asset_v1.AssetServiceClient(**client_kwargs())
+        self.compute_client = compute_v1.DisksClient(**client_kwargs())
 
     def format_network_interfaces(self, network_interfaces):
         formatted_interfaces = []
@@ -39,11 +40,14 @@ class GetDetails:
         formatted_disks = []
         for disk in disks:
             device_name = disk.get('deviceName', 'N/A')
-            disk_name = disk.get('source', '').split('/')[-1]
+            source = disk.get('source', '')
+            disk_name = source.split('/')[-1]
             disk_type = self.get_disk_type(zone, disk_name) if disk_name != '' else 'N/A'
             disk_image = self.get_disk_image(disk_name, zone) if disk_name != '' else 'N/A'
             disk_details = {
                 'diskName': disk_name,
+                # Zonal or regional path of the disk, e.g. projects/p/regions/r/disks/d
+                'source': 'projects/' + source.split('projects/', 1)[-1] if source else 'N/A',
                 'image': disk_image,
                 'diskSizeGb': disk.get('diskSizeGb', 10),
                 'deviceName': device_name,
@@ -94,6 +98,43 @@ class GetDetails:
 
         return instance_details_list
 
+    def get_subnet_details(self):
+        project_resource = f"projects/{self.source_project}"
+        request = asset_v1.ListAssetsRequest(
+            parent=project_resource,
+            asset_types=['compute.googleapis.com/Subnetwork'],
+            content_type=asset_v1.ContentType.RESOURCE
+        )
+
+        subnet_details_list = []
+
+        try:
+            response = self.asset_client.list_assets(request=request)
+
+            for asset in response:
+                if not asset.resource:
+                    continue
+                data = asset.resource.data
+                subnet_details = {
+                    'name': data.get('name', 'N/A'),
+                    'region': data.get('region', 'N/A').split('/')[-1],
+                    'network': data.get('network', 'N/A').split('/')[-1],
+                    'ip_cidr_range': data.get('ipCidrRange', 'N/A'),
+                    'secondary_ip_ranges': [
+                        {
+                            'range_name': secondary_range.get('rangeName', 'N/A'),
+                            'ip_cidr_range': secondary_range.get('ipCidrRange', 'N/A')
+                        }
+                        for secondary_range in data.get('secondaryIpRanges', [])
+                    ]
+                }
+                subnet_details_list.append(subnet_details)
+
+        except Exception as e:
+            logging.error(f"An error occurred while fetching subnet details: {e}")
+
+        return subnet_details_list
+
     def get_cloud_run_details(self):
         cloud_run_details_list = []
 
@@ -0,0 +1,192 @@
+import bisect
+import ipaddress
+import logging
+from google.cloud import compute_v1
+from Cassette import client_kwargs
+
+
+class SubnetPlanner:
+    """Plan non-overlapping CIDR ranges for subnets cloned into the target project.
+
+    Keeps an interval index of the ranges already allocated in each target VPC
+    (primary and secondary ranges share the VPC address space) so a source
+    subnet's range can be reproduced when it is free, or moved to the next free
+    block of the same size when it is not, without probing the API per subnet.
+    """
+
+    ADDRESS_POOLS = ['10.0.0.0/8', '172.16.0.0/12', '192.168.0.0/16']
+    DEFAULT_PREFIX_LENGTH = 24
+
+    def __init__(self, target_project):
+        self.target_project = target_project
+        self.subnetwork_client = compute_v1.SubnetworksClient(**client_kwargs())
+        self.allocated = {}
+        self.existing_subnets = set()
+        self.plans = {}
+
+    def load_target_subnets(self):
+        """Seed the interval index with every subnet already in the target project."""
+        try:
+            for _, scoped_list in self.subnetwork_client.aggregated_list(project=self.target_project):
+                for subnet in scoped_list.subnetworks:
+                    region = subnet.region.split('/')[-1]
+                    vpc_name = subnet.network.split('/')[-1]
+                    self.existing_subnets.add((region, subnet.name))
+                    try:
+                        self.reserve(vpc_name, subnet.ip_cidr_range)
+                        for secondary_range in subnet.secondary_ip_ranges:
+                            self.reserve(vpc_name, secondary_range.ip_cidr_range)
+                    except ValueError as e:
+                        logging.error(f"Skipping unparseable range of subnetwork '{subnet.name}' "
+                                      f"in region {region}: {e}")
+        except Exception as e:
+            logging.error(f"An error occurred while listing subnetworks in project {self.target_project}: {e}")
+
+    def subnet_exists(self, subnet_name, region):
+        return (region, subnet_name) in self.existing_subnets
+
+    def get_plan(self, subnet_name, region):
+        return self.plans.get((region, subnet_name))
+
+    def plan_subnets(self, subnet_details, required_subnets=None):
+        """Plan every source subnet in two passes.
+
+        The first pass keeps every source range that is free in the target VPC;
+        source subnets of one VPC never overlap each other, so this is safe. The
+        second pass moves only the ranges that conflicted, so one collision
+        cannot push other subnets off ranges they could have kept.
+
+        subnet_details is the list returned by GetDetails.get_subnet_details().
+        required_subnets is an optional iterable of (region, subnet_name, vpc_name)
+        tuples; subnets referenced there but missing from subnet_details get a
+        fresh /24 in their VPC.
+        """
+        source_subnets = {(subnet['region'], subnet['name']): subnet for subnet in subnet_details}
+        if required_subnets is not None:
+            wanted = {}
+            for region, subnet_name, vpc_name in required_subnets:
+                wanted[(region, subnet_name)] = source_subnets.get((region, subnet_name), {
+                    'name': subnet_name,
+                    'region': region,
+                    'network': vpc_name,
+                    'ip_cidr_range': 'N/A',
+                    'secondary_ip_ranges': []
+                })
+            source_subnets = wanted
+        source_subnets = {key: subnet for key, subnet in source_subnets.items()
+                          if key not in self.existing_subnets and key not in self.plans}
+
+        # First pass: keep every source range that is still free
+        kept_ranges = {}
+        for key, subnet in source_subnets.items():
+            kept_ranges[key] = (
+                self.reserve_if_free(subnet['network'], subnet['ip_cidr_range']),
+                [self.reserve_if_free(subnet['network'], secondary_range['ip_cidr_range'])
+                 for secondary_range in subnet['secondary_ip_ranges']]
+            )
+
+        # Second pass: move only the ranges that conflicted
+        for key, subnet in source_subnets.items():
+            vpc_name = subnet['network']
+            kept_primary, kept_secondaries = kept_ranges[key]
+            primary_range = kept_primary or self.allocate_block(vpc_name, subnet['ip_cidr_range'])
+            if primary_range is None:
+                logging.error(f"No free address range left for subnet '{subnet['name']}' in VPC '{vpc_name}'.")
+                continue
+            if kept_primary is None and subnet['ip_cidr_range'] != 'N/A':
+                logging.info(f"Subnet '{subnet['name']}' range {subnet['ip_cidr_range']} overlaps in VPC "
+                             f"'{vpc_name}'. Reallocated to {primary_range}.")
+
+            secondary_ranges = []
+            for secondary_range, kept_secondary in zip(subnet['secondary_ip_ranges'], kept_secondaries):
+                allocated_range = kept_secondary or self.allocate_block(vpc_name, secondary_range['ip_cidr_range'])
+                if allocated_range is None:
+                    logging.error(f"No free address range left for secondary range "
+                                  f"'{secondary_range['range_name']}' of subnet '{subnet['name']}'.")
+                    continue
+                if kept_secondary is None:
+                    logging.info(f"Secondary range '{secondary_range['range_name']}' "
+                                 f"{secondary_range['ip_cidr_range']} of subnet '{subnet['name']}' overlaps in VPC "
+                                 f"'{vpc_name}'. "
+                                 f"Reallocated to {allocated_range}.")
+                secondary_ranges.append({
+                    'range_name': secondary_range['range_name'],
+                    'ip_cidr_range': allocated_range
+                })
+            self.plans[key] = {
+                'ip_cidr_range': primary_range,
+                'secondary_ip_ranges': secondary_ranges
+            }
+        return self.plans
+
+    def reserve(self, vpc_name, cidr):
+        # IPv6-only subnets have no IPv4 primary range to reserve
+        if not cidr:
+            return
+        network = ipaddress.ip_network(cidr, strict=False)
+        if network.version != 4:
+            return
+        self.insert_interval(vpc_name, int(network.network_address), int(network.broadcast_address))
+
+    def reserve_if_free(self, vpc_name, cidr):
+        """Reserve cidr and return it if it is free in the VPC, else return None."""
+        if not cidr or cidr == 'N/A':
+            return None
+        network = ipaddress.ip_network(cidr, strict=False)
+        start, end = int(network.network_address), int(network.broadcast_address)
+        if self.find_overlap(vpc_name, start, end) is not None:
+            return None
+        self.insert_interval(vpc_name, start, end)
+        return str(network)
+
+    def allocate_block(self, vpc_name, cidr):
+        """Reserve the first free block the size of cidr (a /24 when unknown) and return it."""
+        if cidr and cidr != 'N/A':
+            prefix_length = ipaddress.ip_network(cidr, strict=False).prefixlen
+        else:
+            prefix_length = self.DEFAULT_PREFIX_LENGTH
+
+        for pool in self.ADDRESS_POOLS:
+            pool_network = ipaddress.ip_network(pool)
+            if prefix_length < pool_network.prefixlen:
+                continue
+            block = self.find_free_block(vpc_name, pool_network, prefix_length)
+            if block is not None:
+                self.insert_interval(vpc_name, int(block.network_address), int(block.broadcast_address))
+                return str(block)
+        return None
+
+    def find_free_block(self, vpc_name, pool_network, prefix_length):
+        size = 1 << (32 - prefix_length)
+        pool_end = int(pool_network.broadcast_address)
+        candidate = int(pool_network.network_address)
+        while candidate + size - 1 <= pool_end:
+            overlap = self.find_overlap(vpc_name, candidate, candidate + size - 1)
+            if overlap is None:
+                return ipaddress.ip_network((candidate, prefix_length))
+            # Jump past the blocking interval to the next aligned candidate
+            candidate = (overlap[1] + size) // size * size
+        return None
+
+    def find_overlap(self, vpc_name, start, end):
+        """Return the allocated (start, end) interval overlapping [start, end], if any."""
+        starts, ends = self.allocated.get(vpc_name, ([], []))
+        index = bisect.bisect_right(starts, end) - 1
+        if index >= 0 and ends[index] >= start:
+            return starts[index], ends[index]
+        return None
+
+    def insert_interval(self, vpc_name, start, end):
+        starts, ends = self.allocated.setdefault(vpc_name, ([], []))
+        index = bisect.bisect_left(starts, start)
+        # Merge overlapping and adjacent neighbours so the index stays small and disjoint
+        while index > 0 and ends[index - 1] >= start - 1:
+            index -= 1
+            start = min(start, starts[index])
+            end = max(end, ends[index])
+            del starts[index], ends[index]
+        while index < len(starts) and starts[index] <= end + 1:
+            end = max(end, ends[index])
+            del starts[index], ends[index]
+        starts.insert(index, start)
+        ends.insert(index, end)
@@ -1,7 +1,10 @@
+import argparse
+import contextlib
 import logging
 from GetDetails import GetDetails
 from CreateCloudRun import CloudRunCreator
 from CreateVM import VMCreator
+from Cassette import Cassette
 from rich.console import Console
 from rich.table import Table
 from rich.prompt import Prompt
@@ -13,8 +16,20 @@ def main():
     # Initialize logging
     logging.basicConfig(level=logging.INFO)
 
-    console = Console()
+    args = parse_arguments()
+    if args.record:
+        cassette = Cassette(args.record, mode='record')
+    elif args.replay:
+        cassette = Cassette(args.replay, mode='replay', timing_fidelity=args.replay_timing)
+    else:
+        cassette = contextlib.nullcontext()
 
+    with cassette:
+        run(Console(), args.clone_disks)
+
+
+def run(console, clone_disks=False):
+    """Run the interactive copy flow."""
     # Display welcome message
     display_welcome_message(console)
 
@@ -29,13 +44,31 @@ def main():
     get_details = GetDetails(source_project=source_project_id)
 
     # Execute based on the user choice
-    execute_choice(console, service_choice, get_details, target_project_id, source_project_id)
+    execute_choice(console, service_choice, get_details, target_project_id, source_project_id, clone_disks)
 
     # Finish message
     console.print(Panel("[bold green]Copying process completed. Thank you for using GCP Service Copier![/bold green]",
                         expand=False))
 
 
+def parse_arguments():
+    """Parse the optional record/replay arguments."""
+    parser = argparse.ArgumentParser(description="Copy GCP services from one project to another.")
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument("--record", metavar="CASSETTE",
+                                help="Record every GCP API call of this run to a cassette file.")
+    cassette_group.add_argument("--replay", metavar="CASSETTE",
+                                help="Serve GCP API calls from a recorded cassette file instead of the live APIs.")
+    parser.add_argument("--clone-disks", action="store_true",
+                        help="Snapshot VM disks and create the cloned disks from the snapshots so they keep "
+                             "their data. Instances with snapshotted disks are created one by one instead of "
+                             "in bulk.")
+    parser.add_argument("--replay-timing", action="store_true",
+                        help="When replaying, wait as long as each recorded call originally took and keep the "
+                             "client-side operation polling delays.")
+    return parser.parse_args()
+
+
 def display_welcome_message(console):
     """Display the welcome message."""
     console.print(Panel("[bold cyan]Welcome to the GCP Service Copier![/bold cyan]", expand=False))
@@ -76,7 +109,7 @@ def display_service_choice_menu(console):
         return choice
 
 
-def execute_choice(console, service_choice, get_details, target_project_id, source_project_id):
+def execute_choice(console, service_choice, get_details, target_project_id, source_project_id, clone_disks=False):
     """Execute the choice based on user's selection."""
     if service_choice == '1':
         console.print("[bold blue]You have chosen to copy Cloud Run services.[/bold blue]")
@@ -116,8 +149,10 @@ def execute_choice(console, service_choice, get_details, target_project_id, sour
             console.print("[bold red]No VM instances found.[/bold red]")
 
         # Proceed with copying VM instances
-        vm_creator = VMCreator(target_project=target_project_id)
-        vm_creator.clone_instances_to_target_project(instances_details)
+        subnet_details = get_details.get_subnet_details()
+        vm_creator = VMCreator(target_project=target_project_id, source_project=source_project_id,
+                               clone_disks=clone_disks)
+        vm_creator.clone_instances_to_target_project(instances_details, subnet_details)
 
     elif service_choice == '3':
         console.print("[bold blue]You have chosen to copy all services.[/bold blue]")
@@ -152,8 +187,10 @@ def execute_choice(console, service_choice, get_details, target_project_id, sour
             console.print("[bold red]No VM instances found.[/bold red]")
 
         # Proceed with copying VM instances
-        vm_creator = VMCreator(target_project=target_project_id)
-        vm_creator.clone_instances_to_target_project(instances_details)
+        subnet_details = get_details.get_subnet_details()
+        vm_creator = VMCreator(target_project=target_project_id, source_project=source_project_id,
+                               clone_disks=clone_disks)
+        vm_creator.clone_instances_to_target_project(instances_details, subnet_details)
 
 
 if __name__ == '__main__':